@@ -1,19 +1,16 @@
 #!/usr/bin/env python3
 
+import matplotlib
 import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-import matplotlib.transforms as transforms
+from matplotlib.patches import Patch
 import numpy as np
-import csv
+import pandas as pd
+import functools
+import os
 import sys
 
-huge_file = sys.argv[1]
-base_file = sys.argv[2]
-outname = None
-if len(sys.argv) >= 4:
-    outname = sys.argv[3]
-
 KERNEL_ORDER = ["Linux", "FOM", "HugeTLBFS"]
+KERNEL_RANK = {k: i for i, k in enumerate(KERNEL_ORDER)}
 colors = {"Baseline": "tab:blue",
     "Nontemporal Zero": "tab:orange",
     "follow_page_mask Fix": "tab:green",
@@ -21,79 +18,91 @@ colors = {"Baseline": "tab:blue",
     "No track_pfn_insert": "tab:purple",
     "Disable Metadata": "tab:brown",
     "Preallocation": "tab:gray"}
-used_labels = {}
 
 barwidth = 0.2
 
 def read_file(infile):
-    data = {}
-    kernels = set()
-    with open(infile, 'r') as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            kernel = row['Kernel']
-            opt = row['Optimization']
-            tput = float(row['Throughput'])
-
-            kernels.add(kernel)
-            if kernel in data:
-                data[kernel].append((opt, tput))
-            else:
-                data[kernel] = [(opt, tput)]
+    return read_file_cached(infile, os.path.getmtime(infile))
+
+# Keyed on the modification time as well so an edited CSV is parsed again.
+# Callers must not modify the returned data since it is shared between calls.
+@functools.lru_cache(maxsize=None)
+def read_file_cached(infile, mtime):
+    df = pd.read_csv(infile, dtype={'Kernel': 'category', 'Optimization': 'category',
+        'Throughput': np.float32})
+
+    # Each kernel's optimizations are stacked from lowest to highest throughput
+    df = df.sort_values('Throughput', kind='stable')
+    data = {k: (g['Optimization'].tolist(), g['Throughput'].to_numpy())
+        for k, g in df.groupby('Kernel', sort=False, observed=True)}
+    kernels = df['Kernel'].unique().tolist()
     return (data, kernels)
 
-def plot_stacked_bars(ax, cur_x, vals):
-    bottom = 0
-    for opt,tput in vals:
-        color = colors[opt]
-        if opt in used_labels:
-            label = None
-        else:
-            label = opt
-            used_labels[opt] = True
-        ax.bar(cur_x, tput - bottom, width=barwidth, bottom=bottom, label=label, color=color)
-        bottom = tput
+# Return the x positions, heights, bottoms and colors of one stacked bar's segments
+def stack_bars(cur_x, opts, tputs):
+    # Each segment spans from the previous optimization's throughput up to its own
+    bottoms = np.roll(tputs, 1)
+    bottoms[0] = 0
+    return (np.full_like(tputs, cur_x), tputs - bottoms, bottoms, [colors[o] for o in opts])
 
 def make_plot(ax, data, kernels):
-    kernels = sorted(list(kernels), key = lambda w: KERNEL_ORDER.index(w))
+    kernels = sorted(kernels, key=KERNEL_RANK.__getitem__)
     cur_x = 0.2
     xticks = []
     tick_labels = []
+    bars = []
 
     # Plot the huge page stuff
     for k in kernels:
         xticks.append(cur_x)
         tick_labels.append(k)
 
-        data[k].sort(key=lambda w: w[1])
-        plot_stacked_bars(ax, cur_x, data[k])
+        bars.append(stack_bars(cur_x, *data[k]))
 
         cur_x += 2 * barwidth
 
+    # Draw every segment on the axis with a single call. There is nothing to
+    # draw if the file had no data.
+    if bars:
+        (xs, heights, bottoms, bar_colors) = zip(*bars)
+        ax.bar(np.concatenate(xs), np.concatenate(heights), width=barwidth,
+            bottom=np.concatenate(bottoms), color=np.concatenate(bar_colors))
+
     ax.set_xticks(xticks)
     ax.set_xticklabels(tick_labels, fontsize=16)
     ax.set_ylabel("Throughput (GB/s)", fontsize=16)
 
+def main(argv):
+    huge_file = argv[1]
+    base_file = argv[2]
+    outname = None
+    if len(argv) >= 4:
+        outname = argv[3]
+
+    # Nothing is shown when saving to a file, so skip setting up a GUI backend
+    if outname:
+        matplotlib.use("Agg")
+
+    (huge_data, huge_kernels) = read_file(huge_file)
+    (base_data, base_kernels) = read_file(base_file)
 
-(huge_data, huge_kernels) = read_file(huge_file)
-(base_data, base_kernels) = read_file(base_file)
+    fig, (base_ax, huge_ax) = plt.subplots(1, 2, figsize=(10,7))
+    base_ax.set_title("Base Pages", fontsize=16)
+    huge_ax.set_title("Huge Pages", fontsize=16)
 
-fig, (base_ax, huge_ax) = plt.subplots(1, 2, figsize=(10,7))
-base_ax.set_title("Base Pages", fontsize=16)
-huge_ax.set_title("Huge Pages", fontsize=16)
+    make_plot(base_ax, base_data, base_kernels)
+    make_plot(huge_ax, huge_data, huge_kernels)
 
-make_plot(base_ax, base_data, base_kernels)
-make_plot(huge_ax, huge_data, huge_kernels)
+    # The bars are drawn without labels, so build the legend from the optimizations
+    # that were plotted, in the order they are listed in colors
+    used_labels = {opt for data in (base_data, huge_data) for (opts, _) in data.values() for opt in opts}
+    handles = [Patch(facecolor=color, label=opt) for opt, color in colors.items() if opt in used_labels]
+    huge_ax.legend(handles=handles, bbox_to_anchor=(1.01, 1), loc="upper left", fontsize=14)
 
-handles = []
-labels = []
-for ax in fig.axes:
-    (h, l) = ax.get_legend_handles_labels()
-    handles.extend(h)
-    labels.extend(l)
-plt.legend(handles, labels, bbox_to_anchor=(1.01, 1), loc="upper left", fontsize=14)
+    if outname:
+        fig.savefig(outname, bbox_inches="tight")
+    else:
+        plt.show()
 
-if outname:
-    plt.savefig(outname, bbox_inches="tight")
-plt.show()
+if __name__ == "__main__":
+    main(sys.argv)
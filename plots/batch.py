@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+# Generate several plots in one process so python and matplotlib only have to
+# start up once. The manifest is a CSV file where each row is the name of a plot
+# script in this directory followed by the arguments to pass to it, e.g.
+#
+#   gups,gups.csv,gups.pdf
+#   free_throughput,free.csv,Free Throughput,free.pdf
+#
+# Every plot should be given an output file since nothing is shown.
+
+import matplotlib
+import matplotlib.pyplot as plt
+import csv
+import importlib
+import os
+import sys
+
+manifest = sys.argv[1]
+
+matplotlib.use("Agg")
+
+with open(manifest, 'r') as f:
+    reader = csv.reader(f)
+
+    for row in reader:
+        # Skip empty lines and comments
+        if not row or row[0].startswith("#"):
+            continue
+
+        script = os.path.splitext(os.path.basename(row[0]))[0]
+        module = importlib.import_module(script)
+        module.main([row[0]] + row[1:])
+
+        plt.close("all")
@@ -1,69 +1,57 @@
 #!/usr/bin/env python3
 
+import matplotlib
 import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-import matplotlib.transforms as transforms
 import numpy as np
-import csv
+import pandas as pd
 import sys
 
-infile = sys.argv[1]
-title = sys.argv[2]
-outname = None
-if len(sys.argv) >= 4:
-    outname = sys.argv[3]
-
 KERNEL_ORDER = ["Linux", "FOM", "HugeTLBFS"]
-data = {}
+KERNEL_RANK = {k: i for i, k in enumerate(KERNEL_ORDER)}
 
 barwidth = 0.2
-cur_x = 0.2
-
-xticks = []
-tick_labels = []
-kernels = set()
-
-with open(infile, 'r') as f:
-    reader = csv.DictReader(f)
-
-    for row in reader:
-        kernel = row['Kernel']
-        tput = float(row['Throughput'])
 
-        kernels.add(kernel)
-        data[kernel] = tput
+def main(argv):
+    infile = argv[1]
+    title = argv[2]
+    outname = None
+    if len(argv) >= 4:
+        outname = argv[3]
 
-kernels = sorted(list(kernels), key = lambda w: KERNEL_ORDER.index(w))
+    # Nothing is shown when saving to a file, so skip setting up a GUI backend
+    if outname:
+        matplotlib.use("Agg")
 
-plt.figure(figsize=(5, 7))
+    df = pd.read_csv(infile, dtype={'Kernel': 'category', 'Throughput': np.float32})
+    data = dict(zip(df['Kernel'], df['Throughput']))
+    kernels = df['Kernel'].unique().tolist()
 
-highest = 0
-second_highest = 0
-for k in kernels:
-    xticks.append(cur_x)
-    tick_labels.append(k)
+    kernels = sorted(kernels, key=KERNEL_RANK.__getitem__)
 
-    tput = data[k]
+    xticks = np.arange(len(kernels)) * 2 * barwidth + 0.2
+    tick_labels = kernels
+    tputs = np.array([data[k] for k in kernels])
 
-    if tput > highest:
-        second_highest = highest
-        highest = tput
-        highest_pos = cur_x
-        highest_kernel = k
+    fig, ax = plt.subplots(figsize=(5, 7))
 
-    plt.bar(cur_x, tput, width=barwidth, color="tab:blue")
+    ax.bar(xticks, tputs, width=barwidth, color="tab:blue")
 
-    cur_x += 2* barwidth
+    # Determine if we need to truncate the graph
+    highest_idx = np.argmax(tputs)
+    second_highest = np.partition(tputs, -2)[-2]
+    if tputs[highest_idx] / second_highest > 5:
+        ax.set_ylim((0, second_highest * 1.1))
+        ax.text(xticks[highest_idx], second_highest * 1.09, str(int(tputs[highest_idx])), color='white', fontsize=12, ha='center', va='top')
 
-# Determine if we need to truncate the graph
-if highest/second_highest > 5:
-    plt.ylim((0, second_highest * 1.1))
-    plt.text(highest_pos, second_highest * 1.09, str(int(data[highest_kernel])), color='white', fontsize=12, ha='center', va='top')
+    ax.set_xticks(xticks)
+    ax.set_xticklabels(tick_labels, fontsize=16)
+    ax.set_ylabel("Throughput (GB/s)", fontsize=16)
+    ax.set_title(title, fontsize=16)
 
-plt.xticks(xticks, tick_labels, fontsize=16)
-plt.ylabel("Throughput (GB/s)", fontsize=16)
-plt.title(title, fontsize=16)
+    if outname:
+        fig.savefig(outname, bbox_inches="tight")
+    else:
+        plt.show()
 
-if outname:
-    plt.savefig(outname, bbox_inches="tight")
-plt.show()
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,61 +1,52 @@
 #!/usr/bin/env python3
 
+import matplotlib
 import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-import matplotlib.transforms as transforms
 import numpy as np
-import csv
+import pandas as pd
 import sys
 
-infile = sys.argv[1]
-outname = None
-if len(sys.argv) >= 3:
-    outname = sys.argv[2]
-
 KERNEL_ORDER = ["Linux", "FOM", "HugeTLBFS"]
+KERNEL_RANK = {k: i for i, k in enumerate(KERNEL_ORDER)}
 
 barwidth = 0.2
 
-data = {}
-kernels = set()
-with open(infile, 'r') as f:
-    reader = csv.DictReader(f)
-
-    for row in reader:
-        kernel = row['Kernel']
-        thp = row['THP'] == 'TRUE'
-        gups = float(row['GUPS'])
+def make_plot(ax, data, kernels, thp):
+    xticks = np.arange(len(kernels)) * 2 * barwidth + 0.2
 
-        kernels.add(kernel)
-        data[(kernel, thp)] = gups
+    ax.bar(xticks, [data[(k, thp)] for k in kernels], width=barwidth, color="tab:blue")
 
-kernels = sorted(list(kernels), key = lambda w: KERNEL_ORDER.index(w))
+    ax.set_xticks(xticks)
+    ax.set_xticklabels(kernels, fontsize=16)
 
-def make_plot(ax, data, kernels, thp):
-    cur_x = 0.2
-    xticks = []
-    tick_labels = []
+def main(argv):
+    infile = argv[1]
+    outname = None
+    if len(argv) >= 3:
+        outname = argv[2]
 
-    for k in kernels:
-        xticks.append(cur_x)
-        tick_labels.append(k)
+    # Nothing is shown when saving to a file, so skip setting up a GUI backend
+    if outname:
+        matplotlib.use("Agg")
 
-        gups = data[(k, thp)]
+    df = pd.read_csv(infile, dtype={'Kernel': 'category', 'THP': str, 'GUPS': np.float32})
+    data = dict(zip(zip(df['Kernel'], df['THP'] == 'TRUE'), df['GUPS']))
+    kernels = df['Kernel'].unique().tolist()
 
-        ax.bar(cur_x, gups, width=barwidth, color="tab:blue")
+    kernels = sorted(kernels, key=KERNEL_RANK.__getitem__)
 
-        cur_x += 2 * barwidth
-    ax.set_xticks(xticks)
-    ax.set_xticklabels(tick_labels, fontsize=16)
+    fig, (base_ax, huge_ax) = plt.subplots(1, 2, sharey=True, figsize=(10,7))
+    base_ax.set_title("Base Pages", fontsize=16)
+    huge_ax.set_title("Huge Pages", fontsize=16)
+    base_ax.set_ylabel("GUPS", fontsize=16)
 
-fig, (base_ax, huge_ax) = plt.subplots(1, 2, sharey=True, figsize=(10,7))
-base_ax.set_title("Base Pages", fontsize=16)
-huge_ax.set_title("Huge Pages", fontsize=16)
-base_ax.set_ylabel("GUPS", fontsize=16)
+    make_plot(base_ax, data, kernels, False)
+    make_plot(huge_ax, data, kernels, True)
 
-make_plot(base_ax, data, kernels, False)
-make_plot(huge_ax, data, kernels, True)
+    if outname:
+        fig.savefig(outname, bbox_inches="tight")
+    else:
+        plt.show()
 
-if outname:
-    plt.savefig(outname, bbox_inches="tight")
-plt.show()
+if __name__ == "__main__":
+    main(sys.argv)
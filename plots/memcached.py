@@ -1,87 +1,77 @@
 #!/usr/bin/env python3
 
+import matplotlib
 import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-import matplotlib.transforms as transforms
 from matplotlib.patches import Patch
 import numpy as np
-import csv
+import pandas as pd
 import sys
 
-infile = sys.argv[1]
-outname = None
-if len(sys.argv) >= 3:
-    outname = sys.argv[2]
-
 KERNEL_ORDER = ["Linux", "FOM", "HugeTLBFS"]
+KERNEL_RANK = {k: i for i, k in enumerate(KERNEL_ORDER)}
 WKLD_ORDER = ["Read", "Read/Write", "Insert"]
+WKLD_RANK = {w: i for i, w in enumerate(WKLD_ORDER)}
 colors = {"Linux": "tab:blue", "FOM": "tab:orange"}
 
 barwidth = 0.2
 
-data = {}
-kernels = set()
-wklds = set()
-with open(infile, 'r') as f:
-    reader = csv.DictReader(f)
-
-    for row in reader:
-        kernel = row['Kernel']
-        wkld = row['Workload']
-        thp = row['THP'] == 'TRUE'
-        tput = float(row['Throughput'])
-
-        kernels.add(kernel)
-        wklds.add(wkld)
-        data[(kernel, wkld, thp)] = tput
-
-kernels = sorted(list(kernels), key = lambda w: KERNEL_ORDER.index(w))
-wklds = sorted(list(wklds), key = lambda w: WKLD_ORDER.index(w))
-
-plt.figure(figsize=(10,7))
-
-cur_x = 0.2
-xticks = []
-tick_labels = []
-
-for wkld in wklds:
-    start_x = cur_x
-    for hpage in [True, False]:
-        for kernel in kernels:
-            tput = data[(kernel, wkld, hpage)]
-#            tput_base = data[(kernel, wkld, False)]
-#            tput_huge = data[(kernel, wkld, True)]
-
-            color = colors[kernel]
-            if not hpage:
-                hatch = "//"
-            else:
-                hatch = None
-
-            plt.bar(cur_x, tput, width=barwidth, color=color, hatch=hatch,
-                edgecolor="black", linewidth=0.5)
-            cur_x += barwidth
-#            plt.bar(cur_x, tput_base, width=barwidth, color=color, hatch="/",
-#                edgecolor="black", linewidth=0.5)
-#            cur_x += barwidth
-    
-    xticks.append((start_x + cur_x - barwidth) / 2)
-    tick_labels.append(wkld)
-    cur_x += barwidth
-
-# Generate the legend
-legend_elements = []
-for k in kernels:
-    h_label = k + " Huge"
-    b_label = k + " Base"
-    legend_elements.append(Patch(facecolor=colors[k], edgecolor="k", label=h_label))
-    legend_elements.append(Patch(facecolor=colors[k], edgecolor="k", label=b_label,
-        hatch="///"))
-
-plt.xticks(ticks=xticks, labels=tick_labels, fontsize=16)
-plt.ylabel("Throughput (ops/sec)", fontsize=16)
-plt.legend(handles=legend_elements, bbox_to_anchor=(1.01, 1), loc="upper left", fontsize=14)
-
-if outname:
-    plt.savefig(outname, bbox_inches="tight")
-plt.show()
+def main(argv):
+    infile = argv[1]
+    outname = None
+    if len(argv) >= 3:
+        outname = argv[2]
+
+    # Nothing is shown when saving to a file, so skip setting up a GUI backend
+    if outname:
+        matplotlib.use("Agg")
+
+    df = pd.read_csv(infile, dtype={'Kernel': 'category', 'Workload': 'category', 'THP': str,
+        'Throughput': np.float32})
+    data = dict(zip(zip(df['Kernel'], df['Workload'], df['THP'] == 'TRUE'), df['Throughput']))
+    kernels = df['Kernel'].unique().tolist()
+    wklds = df['Workload'].unique().tolist()
+
+    kernels = sorted(kernels, key=KERNEL_RANK.__getitem__)
+    wklds = sorted(wklds, key=WKLD_RANK.__getitem__)
+
+    fig, ax = plt.subplots(figsize=(10,7))
+
+    # Each workload gets a group with the huge page bars for every kernel followed
+    # by the base page bars, with a one bar gap between groups
+    nkernels = len(kernels)
+    group_x = np.arange(len(wklds)) * (2 * nkernels + 1) * barwidth + 0.2
+    huge_x = (group_x[:, np.newaxis] + np.arange(nkernels) * barwidth).ravel()
+    base_x = huge_x + nkernels * barwidth
+
+    huge_tputs = [data[(k, w, True)] for w in wklds for k in kernels]
+    base_tputs = [data[(k, w, False)] for w in wklds for k in kernels]
+    bar_colors = [colors[k] for w in wklds for k in kernels]
+
+    ax.bar(huge_x, huge_tputs, width=barwidth, color=bar_colors, edgecolor="black", linewidth=0.5)
+    ax.bar(base_x, base_tputs, width=barwidth, color=bar_colors, hatch="//",
+        edgecolor="black", linewidth=0.5)
+
+    xticks = group_x + (2 * nkernels - 1) * barwidth / 2
+    tick_labels = wklds
+
+    # Generate the legend
+    legend_elements = []
+    for k in kernels:
+        h_label = k + " Huge"
+        b_label = k + " Base"
+        legend_elements.append(Patch(facecolor=colors[k], edgecolor="k", label=h_label))
+        legend_elements.append(Patch(facecolor=colors[k], edgecolor="k", label=b_label,
+            hatch="///"))
+
+    ax.set_xticks(xticks)
+    ax.set_xticklabels(tick_labels, fontsize=16)
+    ax.set_ylabel("Throughput (ops/sec)", fontsize=16)
+    ax.legend(handles=legend_elements, bbox_to_anchor=(1.01, 1), loc="upper left", fontsize=14)
+
+    if outname:
+        fig.savefig(outname, bbox_inches="tight")
+    else:
+        plt.show()
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,39 @@
+# Classification of tiered memory experiments shared by the extract scripts
+
+import re
+
+# The flags in the command that change how an experiment is classified
+CMD_FLAGS_RE = re.compile(r"--(tpp|fbmm|hmsdk|dram_size)")
+
+KERNEL_TYPES = {
+    "tpp": "TPP",
+    "hmsdk": "HMSDK",
+}
+
+# (kernel_type, using_base_kernel, did_reserve_mem) -> (sort, experiment_type)
+# Sort is used to group things in google sheets.
+# The values are arbitrary based on how I wanted things ordered.
+EXPERIMENT_TYPES = {
+    ("TPP", False, False): (5, "TPP"),
+    ("TPP", False, True): (5, "TPP"),
+    ("TPP", True, True): (4, "TPP Base  Split"),
+    ("TPP", True, False): (3, "TPP Base  Local"),
+    ("HMSDK", False, False): (2, "HMSDK"),
+    ("HMSDK", False, True): (2, "HMSDK"),
+    ("HMSDK", True, True): (1, "HMSDK Base  Split"),
+    ("HMSDK", True, False): (0, "HMSDK Base  Local"),
+    ("FBMM", False, False): (2, "FBMM"),
+    ("FBMM", False, True): (2, "FBMM"),
+    ("FBMM", True, True): (1, "FBMM Base  Split"),
+    ("FBMM", True, False): (0, "FBMM Base  Local"),
+}
+
+def classify(cmd, machine_class):
+    kernel_type = KERNEL_TYPES.get(machine_class, "FBMM")
+
+    flags = set(CMD_FLAGS_RE.findall(cmd))
+    # False if we are using actual TPP or FBMM, True otherwise
+    using_base_kernel = not (flags & {"tpp", "fbmm", "hmsdk"})
+    did_reserve_mem = "dram_size" in flags
+
+    return EXPERIMENT_TYPES[(kernel_type, using_base_kernel, did_reserve_mem)]
@@ -1,38 +1,48 @@
 #!/usr/bin/env python3
 
 import sys
-import os
 import json
-import re
-import glob
+import mmap
+
+from fast_json import dumps, loads
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-def find_pattern(cmd, pattern):
-    REGEX = "(" + pattern + ")"
-    match = re.search(REGEX, cmd)
-    return match is not None
+# Return the last n lines of a file without reading the lines before them
+def tail(filename, n):
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ) as mm:
+        end = len(mm)
+        if mm[end - 1:end] == b"\n":
+            end -= 1
+
+        pos = end
+        for _ in range(n):
+            pos = mm.rfind(b"\n", 0, pos)
+            if pos < 0:
+                break
+
+        return mm[pos + 1:end].decode().split("\n")
 
-json_data = None
+# Only the last line of input is used
+last_line = None
 for line in sys.stdin:
-    json_data = json.loads(line)
+    last_line = line
+json_data = loads(last_line)
 
 filename = json_data['results_path']
 cmd = json_data['cmd']
-num_allocs = cmd.split()[-1]
-page_size = "Base" if find_pattern(cmd, "disable_thp") else "Huge"
-kernel = "FOM" if find_pattern(cmd, "--fom") else "Linux"
+num_allocs = cmd.rsplit(None, 1)[-1]
+page_size = "Base" if "disable_thp" in cmd else "Huge"
+kernel = "FOM" if "--fom" in cmd else "Linux"
 
-# Read in the file, though we only care about the last 2 line
-lines = []
-for line in open(filename, "r"):
-    lines.append(line)
+# We only care about the last 2 lines of the file
+lines = tail(filename, 2)
 
 # Alloc cycles is in the second to last word in the second to last line
-alloc_cycles = lines[-2].split()[-2]
+alloc_cycles = lines[-2].rsplit(None, 2)[-2]
 # Freeing cycles is in the second to last word in the last line
-free_cycles = lines[-1].split()[-2]
+free_cycles = lines[-1].rsplit(None, 2)[-2]
 
 outdata = {
     "Command": cmd,
@@ -45,4 +55,4 @@ outdata = {
 }
 
 eprint(json.dumps(outdata, indent=2))
-print(json.dumps(outdata))
+print(dumps(outdata))
@@ -1,16 +1,40 @@
 #!/usr/bin/env python3
 
 import sys
-import os
-import json
 import re
 
+from fast_json import dumps, loads
+
+ALLOCTEST_RE = re.compile(r"alloctest ([0-9]+) ([0-9]+)")
+THREADS_RE = re.compile(r"--threads ([0-9]+)")
+
+# Each stat is read from the line containing its prefix, at the given index of
+# the split line
+ALLOCTEST_STATS = (
+	("Total map time:", "map_time", 3),
+	("Total unmap time:", "unmap_time", 3),
+)
+FBMM_STATS = (
+	("file create times:", "file_create_time", 3),
+	("file register times:", "file_register_time", 3),
+	("munmap_timeap times:", "munmap_time", 2),
+)
+
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-json_data = None
+def read_stats(path, keys, stats):
+	for line in open(path, "r"):
+		for (prefix, name, idx) in keys:
+			if prefix in line:
+				stats[name] = line.split(None, idx + 1)[idx]
+				break
+
+# Only the last line of input is used
+last_line = None
 for line in sys.stdin:
-	json_data = json.loads(line)
+	last_line = line
+json_data = loads(last_line)
 
 filename = json_data['results_path']
 cmd = json_data['cmd']
@@ -23,11 +47,11 @@ base_kernel = not ("--fbmm" in cmd)
 populate = "--populate" in cmd
 
 # Find the parameters for the command
-m = re.search("alloctest ([0-9]+) ([0-9]+)", cmd)
+m = ALLOCTEST_RE.search(cmd)
 alloc_size = m.group(1)
 num_allocs = m.group(2)
 
-m = re.search("--threads ([0-9]+)", cmd)
+m = THREADS_RE.search(cmd)
 if m is None:
 	threads = "1"
 else:
@@ -38,31 +62,15 @@ if base_kernel:
 else:
 	kernel = "FBMM"
 
-# Read in the map and unmap times
-map_time = "-1"
-unmap_time = "-1"
-for line in open(alloctest_results, "r"):
-	split = line.split()
+# Stats that are not found are reported as -1
+stats = {name: "-1" for (_, name, _) in ALLOCTEST_STATS + FBMM_STATS}
 
-	if "Total map time:" in line:
-		map_time = split[3]
-	elif "Total unmap time:" in line:
-		unmap_time = split[3]
+# Read in the map and unmap times
+read_stats(alloctest_results, ALLOCTEST_STATS, stats)
 
 # Read in the FBMM stats if applicable
-file_create_time = "-1"
-file_register_time = "-1"
-munmap_time = "-1"
 if not base_kernel:
-	for line in open(fbmm_stats):
-		split = line.split()
-
-		if "file create times:" in line:
-			file_create_time = split[3]
-		elif "file register times:" in line:
-			file_register_time = split[3]
-		elif "munmap_timeap times:" in line:
-			munmap_time = split[2]
+	read_stats(fbmm_stats, FBMM_STATS, stats)
 
 outdata = {
 	"Kernel": kernel,
@@ -70,14 +78,14 @@ outdata = {
 	"Num Allocs": num_allocs,
 	"Threads": threads,
     "Populate": str(populate),
-	"Map Time": map_time,
-	"Unmap Time": unmap_time,
-	"File Create Time": file_create_time,
-	"File Register Time": file_register_time,
-	"Munmap Times": munmap_time,
+	"Map Time": stats["map_time"],
+	"Unmap Time": stats["unmap_time"],
+	"File Create Time": stats["file_create_time"],
+	"File Register Time": stats["file_register_time"],
+	"Munmap Times": stats["munmap_time"],
 	"Command": cmd,
 	"File": filename,
 	"JID": jid,
 }
 
-print(json.dumps(outdata))
+print(dumps(outdata))
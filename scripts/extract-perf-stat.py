@@ -1,81 +1,45 @@
 #!/usr/bin/env python3
 
 import sys
-import os
-import json
-import re
+import numpy as np
+import pandas as pd
+
+from experiment_type import classify
+from fast_json import dumps, loads
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-json_data = None
+# Total up the local and remote DRAM counters in a perf stat log. The event name
+# follows the count, which is in column count_col.
+def read_dram_counts(filename, count_col):
+    df = pd.read_csv(filename, sep=r"\s+", comment="#", header=None,
+        usecols=[count_col, count_col + 1], names=["count", "event"], dtype=str)
+    # Only convert the counter lines, the rest of the output may not be numbers
+    df = df[df["event"].str.contains("_dram", na=False)]
+    sums = df["count"].str.replace(",", "").astype(np.int64).groupby(df["event"]).sum()
+
+    return (sums.filter(like="local_dram").sum(), sums.filter(like="remote_dram").sum())
+
+# Only the last line of input is used
+last_line = None
 for line in sys.stdin:
-    json_data = json.loads(line)
+    last_line = line
+json_data = loads(last_line)
 
 filename = json_data['results_path']
 cmd = json_data['cmd']
 machine_class = json_data['class']
 
-kernel_type = "TPP" if machine_class == "tpp" else "FBMM"
-# False if we are using actual TPP or FBMM, True otherwise
-using_base_kernel = not (("--tpp" in cmd) or ("--fbmm" in cmd))
-did_reserve_mem = "--dram_size" in cmd
-
-experiment_type = kernel_type
-if using_base_kernel:
-    experiment_type += " Base "
-    experiment_type += " Split" if did_reserve_mem else " Local"
-
-# Sort is used to group things in google sheets.
-# The values are arbitrary based on how I wanted things ordered.
-# The code for this is a little hacky, but whatever
-sort = 5 if kernel_type == "TPP" else 2
-if using_base_kernel:
-    sort = sort - 1
-    if not did_reserve_mem:
-        sort = sort - 1
+(sort, experiment_type) = classify(cmd, machine_class)
 
 # Oops, I ran some experiments that collected the perf stats periodically instead of
 # all at once at the end. This variable detects if I did that
 perf_periodic = "perf_periodic" in cmd
 
-local_dram = None
-remote_dram = None
-
-if perf_periodic:
-    for line in open(filename, "r"):
-        # Skip lines that are empty or begin with "#"
-        if line.strip() == "" or line[0] == "#":
-            continue
-
-        split = line.split()
-        count = int(split[1].replace(',', ''))
-        event = split[2]
-
-        if "local_dram" in event:
-            if local_dram is None:
-                local_dram = count
-            else:
-                local_dram += count
-        if "remote_dram" in event:
-            if remote_dram is None:
-                remote_dram = count
-            else:
-                remote_dram += count
-else:
-    for line in open(filename, "r"):
-        split = line.split()
-
-        if len(split) < 2:
-            continue
-
-        value = split[0]
-        label = split[1]
-
-        if "local_dram" in label:
-            local_dram = int(value.replace(',', ''))
-        elif "remote_dram" in label:
-            remote_dram = int(value.replace(',', ''))
+# Periodic lines are "<time> <count> <event>", while the lines printed at the end
+# are "<count> <event>"
+(local_dram, remote_dram) = read_dram_counts(filename, 1 if perf_periodic else 0)
 
 combined = str(local_dram + remote_dram)
 percent_remote = "{:.3f}".format(remote_dram * 100 / float(combined))
@@ -91,4 +55,4 @@ outdata = {
     "File": filename,
 }
 
-print(json.dumps(outdata))
+print(dumps(outdata))
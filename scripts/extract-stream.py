@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 
 import sys
-import os
-import json
 import re
 
+from fast_json import dumps, loads
+
+WEIGHT_RE = re.compile(r"[0-9]+:[0-9]+")
+
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-json_data = None
+# Only the last line of input is used
+last_line = None
 for line in sys.stdin:
-	json_data = json.loads(line)
+	last_line = line
+json_data = loads(last_line)
 
 filename = json_data['results_path']
 cmd = json_data['cmd']
@@ -23,7 +27,7 @@ experiment_type = ""
 if bwmmfs:
 	experiment_type = "BandwidtMMFS"
 	# Search for the node split
-	weights = re.findall("[0-9]+:[0-9]+", cmd)
+	weights = WEIGHT_RE.findall(cmd)
 	for w in weights:
 		experiment_type += " " + w
 else:
@@ -35,7 +39,7 @@ add_bw = None
 triad_bw = None
 
 for line in open(filename, "r"):
-	split = line.split();
+	split = line.split(None, 2)
 	value_name = split[0]
 	if len(split) > 1:
 		bw = split[1]
@@ -62,4 +66,4 @@ outdata = {
 	"JID": jid,
 }
 
-print(json.dumps(outdata))
+print(dumps(outdata))
@@ -1,64 +1,57 @@
 #!/usr/bin/env python3
 
-import sys
+import mmap
 import os
-import json
 import re
+import sys
+
+from experiment_type import classify
+from fast_json import dumps_bytes, loads
+
+# Matches the lines of YCSB output with a value we want, capturing the
+# operation, which value it is, and the value. e.g.
+#   [READ], AverageLatency(us), 123.4
+YCSB_RE = re.compile(rb"^[ \t]*(\S+)[ \t]+\S*?(RunTime|Throughput|AverageLatency)\S*[ \t]+(\S+)", re.MULTILINE)
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-json_data = None
-for line in sys.stdin:
-    json_data = json.loads(line)
+# Only the last line of input is used
+data = sys.stdin.buffer.read()
+lines = data.rsplit(b"\n", 2)
+last_line = lines[-2] if data.endswith(b"\n") else lines[-1]
+json_data = loads(last_line)
 
 filename = json_data['results_path']
 cmd = json_data['cmd']
 machine_class = json_data['class']
 
-if machine_class == "tpp":
-    kernel_type = "TPP"
-elif machine_class == "hmsdk":
-    kernel_type = "HMSDK"
-else:
-    kernel_type = "FBMM"
-# False if we are using actual TPP or FBMM, True otherwise
-using_base_kernel = not (("--tpp" in cmd) or ("--fbmm" in cmd) or ("--hmsdk" in cmd))
-did_reserve_mem = "--dram_size" in cmd
-
-experiment_type = kernel_type
-if using_base_kernel:
-    experiment_type += " Base "
-    experiment_type += " Split" if did_reserve_mem else " Local"
-
-# Sort is used to group things in google sheets.
-# The values are arbitrary based on how I wanted things ordered.
-# The code for this is a little hacky, but whatever
-sort = 5 if kernel_type == "TPP" else 2
-if using_base_kernel:
-    sort = sort - 1
-    if not did_reserve_mem:
-        sort = sort - 1
+(sort, experiment_type) = classify(cmd, machine_class)
 
 # Parse the YCSB file for the results
 runtime = None
 throughput = None
 latency = None
 
-# The index of the split line array of the ycsb output that has the name
-# of the value the line has
-for line in open(filename, "r"):
-    split = line.split()
-    op_type = split[0]
-    value_name = split[1]
-    value = split[2]
+# Let the regex engine scan the whole file rather than splitting every line.
+# If a value shows up more than once, the last one wins.
+with open(filename, "rb") as f:
+    # A failed run can leave an empty file, which can't be mmapped
+    if os.fstat(f.fileno()).st_size == 0:
+        matches = []
+    else:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        matches = YCSB_RE.finditer(mm)
+
+    for match in matches:
+        (op_type, value_name, value) = match.groups()
 
-    if "RunTime" in value_name:
-        runtime = value
-    elif "Throughput" in value_name:
-        throughput = value
-    elif (op_type == "[READ]," or op_type == "[UPDATE],") and "AverageLatency" in value_name:
-        latency = value
+        if value_name == b"RunTime":
+            runtime = value.decode()
+        elif value_name == b"Throughput":
+            throughput = value.decode()
+        elif op_type == b"[READ]," or op_type == b"[UPDATE],":
+            latency = value.decode()
 
 outdata = {
     "Sort": str(sort),
@@ -70,4 +63,5 @@ outdata = {
     "File": filename,
 }
 
-print(json.dumps(outdata))
+# Write the bytes straight to stdout rather than decoding them to print
+sys.stdout.buffer.write(dumps_bytes(outdata) + b"\n")
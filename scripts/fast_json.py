@@ -0,0 +1,27 @@
+# JSON encoding and decoding shared by the extract scripts
+
+# orjson is a good deal faster than the json module, but may not be installed
+try:
+    import orjson
+
+    loads = orjson.loads
+
+    # Return obj encoded as compact JSON in a str
+    def dumps(obj):
+        return orjson.dumps(obj).decode()
+
+    # Return obj encoded as compact JSON in bytes, for writing straight to a
+    # binary stream without decoding it first
+    dumps_bytes = orjson.dumps
+except ImportError:
+    import json
+
+    loads = json.loads
+
+    # Return obj encoded as JSON in a str
+    def dumps(obj):
+        return json.dumps(obj)
+
+    # Return obj encoded as JSON in bytes
+    def dumps_bytes(obj):
+        return json.dumps(obj).encode()
@@ -1,8 +1,11 @@
 #!/usr/bin/python3
 from bcc import BPF
 import argparse
+import atexit
 import sys
 import os
+import time
+import proc_filter
 
 parser = argparse.ArgumentParser(description="Measure how long page faults are on average")
 parser.add_argument("-c", "--comm", help="The name of the process to track")
@@ -19,182 +22,108 @@ struct fault_info_t {
     u64 time_allocing;
     u64 time_zeroing;
     u64 number_faults;
+    // When the thread's current fault, allocation and zeroing started, or 0 if
+    // it is not in one
+    u64 fault_start_ts;
+    u64 alloc_start_ts;
+    u64 zero_start_ts;
     u32 pid;
     u32 tgid;
     char comm[TASK_COMM_LEN];
 };
 
-BPF_HASH(fault_start, u64, u64);
-BPF_HASH(alloc_start, u64, u64);
-BPF_HASH(zero_start, u64, u64);
+// This is deliberately not a per-CPU map. Faults can sleep, e.g. to reclaim or
+// wait for IO, so a thread may end a fault on a different CPU than it started
+// it on, and the exit handler has to find every thread's totals.
 BPF_HASH(fault_stats, u64, struct fault_info_t);
-BPF_PERF_OUTPUT(fault_events);
+EVENTS_DEF
 
-static bool strequals(char *s1, char *s2, u32 len) {
-    for (u32 i = 0; i < len; i++) {
-        if (s1[i] != s2[i]) {
-            return false;
-        }
+FILTER_DEFS
 
-        if (s1[i] == '\\0') {
-            return true;
-        }
-    }
-
-    for (u32 i = 0; i < 2; i++){}
-
-    return true;
-}
-
-int pf_start(struct pt_regs *ctx) {
+static __always_inline int pf_start(void) {
     u64 pid_tgid = bpf_get_current_pid_tgid();
-    u32 pid = pid_tgid >> 32;
-    u32 tgid = pid_tgid & 0xFFFFFFFF;
-    u64 start = bpf_ktime_get_ns();
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
+    struct fault_info_t zero_info = {};
     struct fault_info_t *info;
 
-    bpf_get_current_comm(&comm, sizeof(comm));
-    if (FILTER_PROC)
-        return 0;
-
-    // Create a fault info entry for the process if it does not exist
-    info = fault_stats.lookup(&pid_tgid);
-    if (info == 0) {
-        struct fault_info_t new;
-        new.time_in_fault = 0;
-        new.time_allocing = 0;
-        new.time_zeroing = 0;
-        new.number_faults = 0;
-        new.pid = pid;
-        new.tgid = tgid;
-        bpf_get_current_comm(&new.comm, sizeof(new.comm));
-
-        fault_stats.update(&pid_tgid, &new);
-    }
-
-    fault_start.update(&pid_tgid, &start);
-
-    return 0;
-}
-
-int pf_end(struct pt_regs *ctx) {
-    u64 pid_tgid = bpf_get_current_pid_tgid();
-    u64 end = bpf_ktime_get_ns();
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
-
-    bpf_get_current_comm(&comm, sizeof(comm));
+    // The other handlers only do anything for threads with an entry, so this
+    // is the only place that needs to filter
     if (FILTER_PROC)
         return 0;
 
-    u64 *start;
-    struct fault_info_t *info;
-
-    start = fault_start.lookup(&pid_tgid);
-    if (start == 0)
-        return 0;
-
-    info = fault_stats.lookup(&pid_tgid);
-    if (info == 0) {
+    // Create a fault info entry for the thread if it does not exist
+    info = fault_stats.lookup_or_try_init(&pid_tgid, &zero_info);
+    if (info == 0)
         return 0;
-    }
-
-    info->time_in_fault += end - *start;
-    info->number_faults += 1;
 
-    fault_start.delete(&pid_tgid);
-    fault_stats.update(&pid_tgid, info);
+    info->fault_start_ts = bpf_ktime_get_ns();
 
     return 0;
 }
 
-int alloc_page_start(struct pt_regs *ctx) {
+// Set the timestamp at start_off in the current thread's fault info to now.
+// Only threads that have taken a fault are reported, so don't bother creating
+// an entry here.
+static __always_inline struct fault_info_t *record_start(size_t start_off) {
     u64 pid_tgid = bpf_get_current_pid_tgid();
-    u64 start = bpf_ktime_get_ns();
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
 
-    bpf_get_current_comm(&comm, sizeof(comm));
-    if (FILTER_PROC)
+    struct fault_info_t *info = fault_stats.lookup(&pid_tgid);
+    if (info == 0)
         return 0;
 
-    alloc_start.update(&pid_tgid, &start);
+    *(u64 *)((char *)info + start_off) = bpf_ktime_get_ns();
 
-    return 0;
+    return info;
 }
 
-int alloc_page_end(struct pt_regs *ctx) {
+// Add the time since the timestamp at start_off to the total at total_off in
+// the current thread's fault info, and clear the timestamp.
+// Returns the fault info if anything was added.
+static __always_inline struct fault_info_t *record_end(size_t start_off, size_t total_off) {
     u64 pid_tgid = bpf_get_current_pid_tgid();
     u64 end = bpf_ktime_get_ns();
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
 
-    bpf_get_current_comm(&comm, sizeof(comm));
-    if (FILTER_PROC)
+    struct fault_info_t *info = fault_stats.lookup(&pid_tgid);
+    if (info == 0)
         return 0;
 
-    u64 *start;
-    struct fault_info_t *info;
-
-    start = alloc_start.lookup(&pid_tgid);
-    if (start == 0)
+    u64 *start = (u64 *)((char *)info + start_off);
+    if (*start == 0)
         return 0;
 
-    info = fault_stats.lookup(&pid_tgid);
-    if (info == 0) {
-        return 0;
-    }
+    *(u64 *)((char *)info + total_off) += end - *start;
+    *start = 0;
 
-    info->time_allocing += end - *start;
+    return info;
+}
 
-    fault_stats.update(&pid_tgid, info);
+static __always_inline int pf_end(void) {
+    struct fault_info_t *info = record_end(offsetof(struct fault_info_t, fault_start_ts),
+        offsetof(struct fault_info_t, time_in_fault));
+    if (info != 0)
+        info->number_faults += 1;
 
     return 0;
 }
 
-int zero_page_start(struct pt_regs *ctx) {
-    u64 pid_tgid = bpf_get_current_pid_tgid();
-    u64 start = bpf_ktime_get_ns();
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
-
-    bpf_get_current_comm(&comm, sizeof(comm));
-    if (FILTER_PROC)
-        return 0;
-
-    zero_start.update(&pid_tgid, &start);
-
+static __always_inline int alloc_page_start(void) {
+    record_start(offsetof(struct fault_info_t, alloc_start_ts));
     return 0;
 }
 
-int zero_page_end(struct pt_regs *ctx) {
-    u64 pid_tgid = bpf_get_current_pid_tgid();
-    u64 end = bpf_ktime_get_ns();
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
-
-    bpf_get_current_comm(&comm, sizeof(comm));
-    if (FILTER_PROC)
-        return 0;
-
-    u64 *start;
-    struct fault_info_t *info;
-
-    start = zero_start.lookup(&pid_tgid);
-    if (start == 0)
-        return 0;
-
-    info = fault_stats.lookup(&pid_tgid);
-    if (info == 0) {
-        return 0;
-    }
-
-    info->time_zeroing += end - *start;
+static __always_inline int alloc_page_end(void) {
+    record_end(offsetof(struct fault_info_t, alloc_start_ts),
+        offsetof(struct fault_info_t, time_allocing));
+    return 0;
+}
 
-    fault_stats.update(&pid_tgid, info);
+static __always_inline int zero_page_start(void) {
+    record_start(offsetof(struct fault_info_t, zero_start_ts));
+    return 0;
+}
 
+static __always_inline int zero_page_end(void) {
+    record_end(offsetof(struct fault_info_t, zero_start_ts),
+        offsetof(struct fault_info_t, time_zeroing));
     return 0;
 }
 
@@ -207,8 +136,10 @@ TRACEPOINT_PROBE(sched, sched_process_exit) {
     if (info == 0)
         return 0;
 
+    info->pid = pid;
+    info->tgid = tgid;
     bpf_get_current_comm(info->comm, sizeof(info->comm));
-    fault_events.perf_submit(args, info, sizeof(*info));
+    SUBMIT_EVENT
 
     fault_stats.delete(&pid_tgid);
 
@@ -216,55 +147,114 @@ TRACEPOINT_PROBE(sched, sched_process_exit) {
 }
 """
 
+# The kernel functions to trace and the handlers to run when they are entered
+# and when they return
+PROBES = [
+    ("__handle_mm_fault", "pf_start", "pf_end"),
+    ("hugetlb_fault", "pf_start", "pf_end"),
+    ("clear_huge_page", "zero_page_start", "zero_page_end"),
+    ("ext4_issue_zeroout", "zero_page_start", "zero_page_end"),
+    ("alloc_pages_vma", "alloc_page_start", "alloc_page_end"),
+    ("ext4_ext_map_blocks", "alloc_page_start", "alloc_page_end"),
+]
+
+# fentry/fexit programs are called directly through a BPF trampoline, which is
+# much cheaper than the breakpoint a kprobe takes, so use them when the kernel
+# has BTF. BCC attaches KFUNC_PROBEs automatically when the program is loaded.
+use_kfunc = BPF.support_kfunc()
+if use_kfunc:
+    for (func, entry, ret) in PROBES:
+        bpf_text += "KFUNC_PROBE(%s) { return %s(); }\n" % (func, entry)
+        bpf_text += "KRETFUNC_PROBE(%s) { return %s(); }\n" % (func, ret)
+else:
+    for handler in dict.fromkeys(h for (_, entry, ret) in PROBES for h in (entry, ret)):
+        bpf_text += "int kprobe_%s(struct pt_regs *ctx) { return %s(); }\n" % (handler, handler)
+
+# Ring buffers need Linux 5.8, which is newer than fentry needs, so check for
+# them separately. Older kernels use a perf buffer, which is fine since there is
+# only one event per thread.
+use_ringbuf = BPF.ksymname("bpf_ringbuf_output") != -1
+if use_ringbuf:
+    bpf_text = bpf_text.replace("EVENTS_DEF",
+        "// 1 MiB, the size is in pages\nBPF_RINGBUF_OUTPUT(fault_events, 256);")
+    # Passing no flags lets the kernel skip waking us up when we have not yet
+    # caught up with the events already in the buffer
+    bpf_text = bpf_text.replace("SUBMIT_EVENT",
+        "fault_events.ringbuf_output(info, sizeof(*info), 0);")
+else:
+    bpf_text = bpf_text.replace("EVENTS_DEF", "BPF_PERF_OUTPUT(fault_events);")
+    bpf_text = bpf_text.replace("SUBMIT_EVENT",
+        "fault_events.perf_submit(args, info, sizeof(*info));")
+
 # Do code substitution for the process filtering
 if args.comm:
-    if len(args.comm) > 16:
-        args.comm = args.comm[0:15]
-
-    bpf_text = bpf_text.replace("TARGET_COMM", args.comm)
-    bpf_text = bpf_text.replace("FILTER_PROC", "!strequals(comm, target, TASK_COMM_LEN)")
-else:
-    bpf_text = bpf_text.replace("FILTER_PROC", "0")
+    # Process names are truncated to TASK_COMM_LEN - 1 characters
+    args.comm = args.comm[0:15]
+bpf_text = proc_filter.substitute(bpf_text, args.comm)
 
 if args.ebpf:
     print(bpf_text)
     exit()
 
 b = BPF(text=bpf_text)
-b.attach_kprobe(event="__handle_mm_fault", fn_name="pf_start")
-b.attach_kprobe(event="hugetlb_fault", fn_name="pf_start")
-b.attach_kretprobe(event="__handle_mm_fault", fn_name="pf_end")
-b.attach_kretprobe(event="hugetlb_fault", fn_name="pf_end")
-b.attach_kprobe(event="clear_huge_page", fn_name="zero_page_start")
-b.attach_kprobe(event="ext4_issue_zeroout", fn_name="zero_page_start")
-b.attach_kretprobe(event="clear_huge_page", fn_name="zero_page_end")
-b.attach_kretprobe(event="ext4_issue_zeroout", fn_name="zero_page_end")
-b.attach_kprobe(event="alloc_pages_vma", fn_name="alloc_page_start")
-b.attach_kprobe(event="ext4_ext_map_blocks", fn_name="alloc_page_start")
-b.attach_kretprobe(event="alloc_pages_vma", fn_name="alloc_page_end")
-b.attach_kretprobe(event="ext4_ext_map_blocks", fn_name="alloc_page_end")
+if not use_kfunc:
+    for (func, entry, ret) in PROBES:
+        b.attach_kprobe(event=func, fn_name="kprobe_" + entry)
+        b.attach_kretprobe(event=func, fn_name="kprobe_" + ret)
+if args.comm:
+    proc_filter.add_running(b, args.comm)
 
 header_string = "%-10.10s %-6s %-6s %-14s %-14s %-8s %-14s %-14s"
 format_string = "%-10.10s %-6d %-6d %-14d %-14d %-8d %-14d %-14d"
 print(header_string % ("COMM", "PID", "TID", "FAULT_TIME", "FAULT_COUNT", "AVG", "ALLOC_TIME", "ZERO_TIME"))
 sys.stdout.flush()
 
-def handle_fault_event(cpu, data, size):
+# Events are written out in batches, at most FLUSH_INTERVAL seconds apart,
+# rather than flushing stdout for every thread that exits
+FLUSH_INTERVAL = 0.2
+pending = []
+last_flush = time.monotonic()
+
+def flush_events():
+    global last_flush
+
+    if pending:
+        sys.stdout.write("".join(pending))
+        sys.stdout.flush()
+        pending.clear()
+    last_flush = time.monotonic()
+
+# Don't lose buffered events if we exit early
+atexit.register(flush_events)
+
+def handle_fault_event(ctx, data, size):
     event = b["fault_events"].event(data)
 
-    print(format_string % (event.comm, event.pid, event.tgid, event.time_in_fault,
-        event.number_faults, event.time_in_fault / event.number_faults, event.time_allocing, event.time_zeroing))
-    sys.stdout.flush()
+    pending.append(format_string % (event.comm.decode("utf-8", "replace"), event.pid, event.tgid,
+        event.time_in_fault, event.number_faults, event.time_in_fault / event.number_faults,
+        event.time_allocing, event.time_zeroing) + "\n")
 
-b["fault_events"].open_perf_buffer(handle_fault_event)
+# The first argument to the callback is unused, and is the CPU for perf buffers
+if use_ringbuf:
+    b["fault_events"].open_ring_buffer(handle_fault_event)
+    poll = b.ring_buffer_poll
+else:
+    b["fault_events"].open_perf_buffer(handle_fault_event)
+    poll = b.perf_buffer_poll
 #b.trace_print()
 
 while not os.path.isfile("/tmp/stop_mm_fault_tracker"):
     try:
-        b.perf_buffer_poll()
+        # Wake up periodically even if there are no events so they are never
+        # held back for long
+        poll(int(FLUSH_INTERVAL * 1000))
     except KeyboardInterrupt:
         print()
         break
+
+    if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+        flush_events()
+flush_events()
 print("Exiting mm_fault_tracker.py")
 sys.stdout.flush()
 exit()
@@ -3,9 +3,13 @@ from bcc import BPF
 import argparse
 import sys
 import os
+import time
+import proc_filter
 
 parser = argparse.ArgumentParser(description="Print the length of mmap calls")
 parser.add_argument("-c", "--comm", help="The name of the process to track")
+parser.add_argument("--raw", action="store_true",
+    help="Print every mmap and brk call instead of a histogram of their lengths each second")
 parser.add_argument("--ebpf", action="store_true", help="Print the eBPF script")
 args = parser.parse_args()
 
@@ -14,7 +18,10 @@ bpf_text = """
 #include <linux/fs.h>
 #include <uapi/linux/ptrace.h>
 #include <bcc/proto.h>
+"""
 
+# Send every call to userspace
+raw_text = """
 struct mmap_info_t {
 	u64 len;
 	u32 pid;
@@ -22,68 +29,93 @@ struct mmap_info_t {
 	char comm[TASK_COMM_LEN];
 };
 
-BPF_PERF_OUTPUT(mmap_events);
-BPF_PERF_OUTPUT(brk_events);
+// 1 MiB each, the size is in pages
+BPF_RINGBUF_OUTPUT(mmap_events, 256);
+BPF_RINGBUF_OUTPUT(brk_events, 256);
 
-static bool strequals(char *s1, char *s2, u32 len) {
-    for (u32 i = 0; i < len; i++) {
-        if (s1[i] != s2[i]) {
-            return false;
-        }
+static __always_inline void record_mmap(u64 pid_tgid, u64 len) {
+    struct mmap_info_t info;
 
-        if (s1[i] == '\\0') {
-            return true;
-        }
-    }
+    info.len = len;
+    info.pid = pid_tgid >> 32;
+    info.tgid = pid_tgid & 0xFFFFFFFF;
+    bpf_get_current_comm(&info.comm, sizeof(info.comm));
 
-    for (u32 i = 0; i < 2; i++){}
+    mmap_events.ringbuf_output(&info, sizeof(info), 0);
+}
 
-    return true;
+static __always_inline void record_brk(u64 pid_tgid, u64 len) {
+    struct mmap_info_t info;
+
+    info.len = len;
+    info.pid = pid_tgid >> 32;
+    info.tgid = pid_tgid & 0xFFFFFFFF;
+    bpf_get_current_comm(&info.comm, sizeof(info.comm));
+
+    brk_events.ringbuf_output(&info, sizeof(info), 0);
 }
+"""
+
+# Count the calls in per process log2 histograms of their lengths, which are
+# read from userspace once a second
+hist_text = """
+struct hist_key_t {
+    u32 pid;
+    u64 slot;
+};
+
+// The default of 64 entries fills up with only a few processes, after which
+// new (pid, slot) pairs are silently dropped
+BPF_HISTOGRAM(mmap_hist, struct hist_key_t, 10240);
+BPF_HISTOGRAM(brk_hist, struct hist_key_t, 10240);
+
+static __always_inline void record_mmap(u64 pid_tgid, u64 len) {
+    struct hist_key_t key;
+
+    // Zero the padding too, it is part of the key
+    __builtin_memset(&key, 0, sizeof(key));
+    key.pid = pid_tgid >> 32;
+    key.slot = bpf_log2l(len);
+
+    mmap_hist.atomic_increment(key);
+}
+
+static __always_inline void record_brk(u64 pid_tgid, u64 len) {
+    struct hist_key_t key;
+
+    __builtin_memset(&key, 0, sizeof(key));
+    key.pid = pid_tgid >> 32;
+    key.slot = bpf_log2l(len);
+
+    brk_hist.atomic_increment(key);
+}
+"""
+
+bpf_text += raw_text if args.raw else hist_text
+bpf_text += """
+FILTER_DEFS
 
 int mmap_call(struct pt_regs *ctx, struct file *f, u64 addr, u64 len) {
     u64 pid_tgid = bpf_get_current_pid_tgid();
-    u32 pid = pid_tgid >> 32;
-    u32 tgid = pid_tgid & 0xFFFFFFFF;
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
-    struct mmap_info_t info;
 
-    bpf_get_current_comm(&comm, sizeof(comm));
     if (FILTER_PROC)
         return 0;
 
 	if (f != NULL)
 		return 0;
 
-	info.len = len;
-	info.pid = pid;
-	info.tgid = tgid;
-	bpf_get_current_comm(&info.comm, sizeof(info.comm));
-
-	mmap_events.perf_submit(ctx, &info, sizeof(info));
+	record_mmap(pid_tgid, len);
 
 	return 0;
 }
 
 int brk_call(struct pt_regs *ctx, void *mas, struct vm_area_struct *vma, u64 addr, u64 len) {
     u64 pid_tgid = bpf_get_current_pid_tgid();
-    u32 pid = pid_tgid >> 32;
-    u32 tgid = pid_tgid & 0xFFFFFFFF;
-    char comm[TASK_COMM_LEN];
-    char target[TASK_COMM_LEN] = "TARGET_COMM";
-    struct mmap_info_t info;
 
-    bpf_get_current_comm(&comm, sizeof(comm));
     if (FILTER_PROC)
         return 0;
 
-    info.len = len;
-    info.pid = pid;
-    info.tgid = tgid;
-    bpf_get_current_comm(&info.comm, sizeof(info.comm));
-
-    brk_events.perf_submit(ctx, &info, sizeof(info));
+    record_brk(pid_tgid, len);
 
     return 0;
 }
@@ -91,42 +123,65 @@ int brk_call(struct pt_regs *ctx, void *mas, struct vm_area_struct *vma, u64 add
 
 # Do code substitution for the process filtering
 if args.comm:
-    if len(args.comm) > 16:
-        args.comm = args.comm[0:15]
+    # Process names are truncated to TASK_COMM_LEN - 1 characters
+    args.comm = args.comm[0:15]
+bpf_text = proc_filter.substitute(bpf_text, args.comm)
 
-    bpf_text = bpf_text.replace("TARGET_COMM", args.comm)
-    bpf_text = bpf_text.replace("FILTER_PROC", "!strequals(comm, target, TASK_COMM_LEN)")
-else:
-    bpf_text = bpf_text.replace("FILTER_PROC", "0")
+if args.ebpf:
+    print(bpf_text)
+    exit()
 
 b = BPF(text=bpf_text)
 b.attach_kprobe(event="do_mmap", fn_name="mmap_call")
 b.attach_kprobe(event="do_brk_flags", fn_name="brk_call")
+if args.comm:
+    proc_filter.add_running(b, args.comm)
 
-header_string = "%-10.10s,%-9s,%-6s,%-6s,%-14s"
-format_string = "%-10.10s,%-9s,%-6d,%-6d,%-14d"
-print(header_string % ("COMM", "MMAP/BRK","PID", "TGID", "MMAP_LEN"))
+if args.raw:
+    # Format and write bytes straight to stdout, comm is already bytes and this
+    # skips encoding every line
+    header_string = b"%-10.10s,%-9s,%-6s,%-6s,%-14s\n"
+    format_string = b"%-10.10s,%-9s,%-6d,%-6d,%-14d\n"
+    os.write(1, header_string % (b"COMM", b"MMAP/BRK", b"PID", b"TGID", b"MMAP_LEN"))
 
-def handle_mmap_event(cpu, data, size):
-	event = b["mmap_events"].event(data)
+    def handle_mmap_event(ctx, data, size):
+        event = b["mmap_events"].event(data)
 
-	print(format_string % (event.comm, "MMAP", event.pid, event.tgid, event.len))
-	sys.stdout.flush()
-def handle_brk_event(cpu, data, size):
-	event = b["brk_events"].event(data)
+        os.write(1, format_string % (event.comm, b"MMAP", event.pid, event.tgid, event.len))
+    def handle_brk_event(ctx, data, size):
+        event = b["brk_events"].event(data)
 
-	print(format_string % (event.comm, "BRK", event.pid, event.tgid, event.len))
-	sys.stdout.flush()
+        os.write(1, format_string % (event.comm, b"BRK", event.pid, event.tgid, event.len))
 
-b["mmap_events"].open_perf_buffer(handle_mmap_event)
-b["brk_events"].open_perf_buffer(handle_brk_event)
+    b["mmap_events"].open_ring_buffer(handle_mmap_event)
+    b["brk_events"].open_ring_buffer(handle_brk_event)
 
-while not os.path.isfile("/tmp/stop_mmap_tracker"):
-    try:
-        b.perf_buffer_poll()
-    except KeyboardInterrupt:
-        print()
-        break
+    while not os.path.isfile("/tmp/stop_mmap_tracker"):
+        try:
+            b.ring_buffer_poll()
+        except KeyboardInterrupt:
+            print()
+            break
+else:
+    mmap_hist = b["mmap_hist"]
+    brk_hist = b["brk_hist"]
+
+    exiting = False
+    while not exiting:
+        try:
+            time.sleep(1)
+        except KeyboardInterrupt:
+            print()
+            exiting = True
+        exiting = exiting or os.path.isfile("/tmp/stop_mmap_tracker")
+
+        # This also prints what was counted in the last, partial, second
+        print(time.strftime("%H:%M:%S"))
+        mmap_hist.print_log2_hist("mmap len", "pid")
+        mmap_hist.clear()
+        brk_hist.print_log2_hist("brk len", "pid")
+        brk_hist.clear()
+        sys.stdout.flush()
 print("Exiting mmap_tracker.py")
 sys.stdout.flush()
 exit()
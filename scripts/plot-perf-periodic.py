@@ -1,40 +1,38 @@
 #!/usr/bin/env python3
 
 import sys
-import os
-import re
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 filename = sys.argv[1]
 
-# The key of this dictionary is the perf counter for the event
-# The value is a list of the values
-data = {}
-
-for line in open(filename, "r"):
-    # Skip lines that are empty or begin with "#"
-    if line.strip() == "" or line[0] == "#":
-        continue
-
-    split = line.split()
-    time = float(split[0])
-    count = int(split[1].replace(',', ''))
-    event = split[2]
-
-    if event not in data:
-        data[event] = ([0], [0])
-
-    # Add the current count to the previous to get a running total
-    data[event][0].append(time)
-    data[event][1].append(count)
+# The key of these dictionaries is the perf counter for the event
+# The values are lists of arrays of the times and counts, which are
+# concatenated once everything has been read. Every event starts with a count
+# of 0 at time 0.
+times = {}
+counts = {}
+
+# Read the file in chunks so that only the numbers, not the whole table, are
+# held in memory for long runs. Lines that are empty or begin with "#" are
+# skipped, and so is anything after a "#" on a line.
+reader = pd.read_csv(filename, sep=r"\s+", comment="#", header=None,
+    usecols=[0, 1, 2], names=["time", "count", "event"], thousands=",",
+    chunksize=1000000)
+for chunk in reader:
+    for (event, group) in chunk.groupby("event", sort=False):
+        times.setdefault(event, [np.zeros(1)]).append(group["time"].to_numpy())
+        counts.setdefault(event, [np.zeros(1, dtype=np.int64)]).append(group["count"].to_numpy())
 
 plt.rcParams.update({"font.size": 18})
 
-for event in data:
-    plt.plot(data[event][0], data[event][1], label=event.split('.')[-1])
+# perf reports the count for each interval, which is plotted as is
+for event in times:
+    plt.plot(np.concatenate(times[event]), np.concatenate(counts[event]), label=event.split('.')[-1])
 plt.xlabel("Time (s)")
 plt.ylabel("Event counts")
 plt.legend()
@@ -1,29 +1,15 @@
 #!/usr/bin/env python3
 
 import sys
-import csv
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 
 filename = sys.argv[1]
 
-configs = []
-throughputs = {
-    "Copy": [],
-    "Scale": [],
-    "Add": [],
-    "Triad": []
-}
-
 # Read the data
-with open(filename, "r") as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        configs.append(row['Type'])
-        throughputs['Copy'].append(float(row['Copy']))
-        throughputs['Add'].append(float(row['Add']))
-        throughputs['Scale'].append(float(row['Scale']))
-        throughputs['Triad'].append(float(row['Triad']))
+df = pd.read_csv(filename, dtype={'Type': str})
+configs = df['Type'].to_numpy()
 
 x = np.arange(len(configs))
 print(x)
@@ -31,9 +17,9 @@ width = 0.2
 multiplier = 0
 
 plt.figure(figsize=(10, 6))
-for attr, measurements in throughputs.items():
+for attr in ["Copy", "Scale", "Add", "Triad"]:
     offset = width * multiplier
-    plt.bar(x + offset, measurements, width, label=attr)
+    plt.bar(x + offset, df[attr].to_numpy(dtype=np.float64), width, label=attr)
     multiplier += 1
 
 plt.legend(loc='upper left')
@@ -1,34 +1,22 @@
 #!/usr/bin/env python3
 
-import sys
-import os
 import re
+import sys
 import matplotlib.pyplot as plt
+import numpy as np
 
 filename = sys.argv[1]
 
-# The key of this dictionary is the perf counter for the event
-# The value is a list of the values
-promotions = [0]
-demotions = [0]
-last_promotions = 0
-last_demotions = 0
-
-for line in open(filename, "r"):
-    # The lines we want are of the form "Promotions: [0-9]+ Demotions: [0-9]+"
-    if "Promotions" not in line:
-        continue
-
-    split = line.split()
-    cur_promotions = int(split[1])
-    cur_demotions = int(split[3])
-
-    # Subtract from the previous to get a diff
-    promotions.append(cur_promotions - last_promotions)
-    demotions.append(cur_demotions - last_demotions)
+# The lines we want are of the form "Promotions: [0-9]+ Demotions: [0-9]+"
+with open(filename, "r") as f:
+    counts = re.findall(r"Promotions:\s+(\d+)\s+Demotions:\s+(\d+)", f.read())
+# reshape so that there are still two columns if there are no samples
+counts = np.array(counts, dtype=np.int64).reshape(-1, 2)
 
-    last_promotions = cur_promotions
-    last_demotions = cur_demotions
+# Subtract each count from the previous to get a diff. The counts start at 0,
+# and the extra 0 in front makes the first sample 0 as well.
+promotions = np.diff(counts[:, 0], prepend=[0, 0])
+demotions = np.diff(counts[:, 1], prepend=[0, 0])
 
 plt.rcParams.update({"font.size": 18})
 
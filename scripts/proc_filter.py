@@ -0,0 +1,128 @@
+# Process filtering shared by the eBPF trackers
+#
+# Comparing the name of the current process against the target is too slow to
+# do on every event, so the ids of the target processes are kept in a hash map
+# instead. The map is filled from /proc when the tracker starts and kept up to
+# date by following forks and execs in the kernel.
+
+import ctypes
+import os
+
+# Replaces FILTER_DEFS, which needs to come after the includes and before
+# anything that uses FILTER_PROC. The map is keyed on the upper 32 bits of
+# bpf_get_current_pid_tgid, the kernel's tgid, which is the PID userspace sees.
+# The trackers call that value pid and the lower 32 bits, the thread id, tgid.
+BPF_TEXT = """
+#include <linux/sched/signal.h>
+
+BPF_HASH(target_pids, u32, u8);
+
+static bool strequals(char *s1, char *s2, u32 len) {
+    for (u32 i = 0; i < len; i++) {
+        if (s1[i] != s2[i]) {
+            return false;
+        }
+
+        if (s1[i] == '\\0') {
+            return true;
+        }
+    }
+
+    for (u32 i = 0; i < 2; i++){}
+
+    return true;
+}
+
+static __always_inline bool is_target(u64 pid_tgid) {
+    u32 pid = pid_tgid >> 32;
+
+    return target_pids.lookup(&pid) != 0;
+}
+
+// Children of a target are targets too. The child may be a new thread rather
+// than a process, in which case its entry is unused until it exits.
+// Every task passes through here, so this also clears out stale entries when
+// ids are reused.
+TRACEPOINT_PROBE(sched, sched_process_fork) {
+    u32 pid = bpf_get_current_pid_tgid() >> 32;
+    u32 child = args->child_pid;
+    u8 one = 1;
+
+    if (target_pids.lookup(&pid) != 0)
+        target_pids.update(&child, &one);
+    else
+        target_pids.delete(&child);
+
+    return 0;
+}
+
+// A process becomes a target when it execs the target and stops being one
+// when it execs anything else. This is the only place the name is compared.
+TRACEPOINT_PROBE(sched, sched_process_exec) {
+    u32 pid = bpf_get_current_pid_tgid() >> 32;
+    char comm[TASK_COMM_LEN];
+    char target[TASK_COMM_LEN] = "TARGET_COMM";
+    u8 one = 1;
+
+    bpf_get_current_comm(&comm, sizeof(comm));
+    if (strequals(comm, target, TASK_COMM_LEN))
+        target_pids.update(&pid, &one);
+    else
+        target_pids.delete(&pid);
+
+    return 0;
+}
+
+// This is a raw tracepoint because mm_fault_tracker.py already has a
+// TRACEPOINT_PROBE for sched_process_exit, and a second one would clash with it.
+RAW_TRACEPOINT_PROBE(sched_process_exit) {
+    u64 pid_tgid = bpf_get_current_pid_tgid();
+    u32 pid = pid_tgid >> 32;
+    u32 tgid = pid_tgid & 0xFFFFFFFF;
+    struct task_struct *task = (struct task_struct *)bpf_get_current_task();
+
+    // Remove the entry a new thread got when it was created
+    if (tgid != pid)
+        target_pids.delete(&tgid);
+
+    // The process stays a target until its last thread exits, even if the
+    // main thread exits first, so forks from the other threads are followed.
+    // live has already been decremented for this thread by the time the
+    // tracepoint fires.
+    if (task->signal->live.counter == 0)
+        target_pids.delete(&pid);
+
+    return 0;
+}
+"""
+
+# Fill in the process filter, filtering on comm if it is not None
+def substitute(bpf_text, comm):
+    if comm:
+        bpf_text = bpf_text.replace("FILTER_DEFS", BPF_TEXT.replace("TARGET_COMM", comm))
+        bpf_text = bpf_text.replace("FILTER_PROC", "!is_target(pid_tgid)")
+    else:
+        # Leave out the map and the tracepoints that maintain it entirely so
+        # they cost nothing, and let the compiler drop the checks
+        bpf_text = bpf_text.replace("FILTER_DEFS", "")
+        bpf_text = bpf_text.replace("FILTER_PROC", "0")
+
+    return bpf_text
+
+# Add the processes that are already running comm to the filter
+def add_running(b, comm):
+    target_pids = b["target_pids"]
+
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+
+        try:
+            with open("/proc/%s/comm" % entry, 'r') as f:
+                name = f.read().rstrip("\n")
+        except OSError:
+            # The process has already exited
+            continue
+
+        if name == comm:
+            target_pids[ctypes.c_uint(int(entry))] = ctypes.c_ubyte(1)
@@ -6,9 +6,16 @@
 
 import sys
 import csv
-import numpy as np
+import mmap
+import os
+import re
 from matplotlib import pyplot as plt
-from scipy.interpolate import UnivariateSpline
+import numpy as np
+
+from experiment_type import classify
+
+# The value on the first line of YCSB output that reports the runtime
+RUNTIME_RE = re.compile(rb"^[ \t]*\S+[ \t]+\S*RunTime\S*[ \t]+(\S+)", re.MULTILINE)
 
 input_file = sys.argv[1]
 data = {}
@@ -21,37 +28,30 @@ for row in reader:
     cmd = row['cmd']
     machine_class = row['class']
 
-    if machine_class == "tpp":
-        kernel_type = "TPP"
-    elif machine_class == "hmsdk":
-        kernel_type = "HMSDK"
-    else:
-        kernel_type = "FBMM"
-    # False if we are using actual TPP or FBMM, True otherwise
-    using_base_kernel = not (("--tpp" in cmd) or ("--fbmm" in cmd) or ("--hmsdk" in cmd))
-    did_reserve_mem = "--dram_size" in cmd
-
-    experiment_type = kernel_type
-    if using_base_kernel:
-        experiment_type += " Base "
-        experiment_type += " Split" if did_reserve_mem else " Local"
+    (_, experiment_type) = classify(cmd, machine_class)
 
     if experiment_type not in data:
         data[experiment_type] = []
 
-    for line in open(filename, "r"):
-        split = line.split()
-        value_name = split[1]
-        value = split[2]
+    # The runtime is near the start of the file, so let the regex engine find
+    # it instead of splitting lines until we get there
+    with open(filename, "rb") as results:
+        # A failed run can leave an empty file, which can't be mmapped
+        if os.fstat(results.fileno()).st_size == 0:
+            continue
 
-        if "RunTime" in value_name:
-            data[experiment_type].append(float(value))
-            break
+        with mmap.mmap(results.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+            match = RUNTIME_RE.search(mm)
+            if match:
+                data[experiment_type].append(match.group(1))
 
 plt.rcParams.update({"font.size": 18})
 
+# Plot the exact CDF of each experiment's runtimes rather than binning them
 for exp in data:
-    plt.hist(data[exp], bins=50, density=True, histtype='step', cumulative=True, label=exp)
+    runtimes = np.sort(np.array(data[exp]).astype(np.float64))
+    plt.step(runtimes, np.arange(1, runtimes.size + 1) / runtimes.size, where="post", label=exp)
 
 plt.legend(loc="upper left")
 plt.xlabel("Runtime (ms)")